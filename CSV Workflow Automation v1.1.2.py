@@ -1,9 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 import os, csv, xlwings as xw
-from datetime import datetime, timedelta
+import argparse
+import hashlib
+import json
+from itertools import islice, repeat
+from datetime import datetime
 import logging
+from logging.handlers import TimedRotatingFileHandler
+import queue
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
 from contextlib import contextmanager
+import pythoncom
 
 # CSV Workflow Automation Tool v1.1.2
 # Author: Rose Anne Lafuente
@@ -15,13 +26,14 @@ from contextlib import contextmanager
 #
 #   Key Features:
 #     - Scrollable status box for enhanced log navigation
-#     - Deterministic wafermap coloring via defined C1_MARK color_map
+#     - Deterministic wafermap coloring via defined C1_MARK COLOR_MAP
 #     - Accurate C1_MARK lookup for ET mapping
 #     - Robust error handling with centralized ErrorLogger:
-#         • Auto-creates timestamped error log files in a dedicated /logs folder
-#         • Cleans up logs older than 30 days automatically
+#         • Writes to logs/error.log in a dedicated /logs folder
+#         • Rotates the log daily and keeps the last 30 days automatically
 #         • Provides consistent error capture across all modules
 #     - Context-managed Excel operations for speed and reliability
+#     - Workflow actions run on a background worker so the GUI stays responsive
 #     - GUI title, version label, and developer credit for professional branding
 #
 #   Built with:
@@ -39,27 +51,32 @@ from contextlib import contextmanager
 #     - Integrated ErrorLogger for centralized error tracking and log retention
 
 
-# --- Error Logger with 30-day cleanup ---
+# --- Error Logger with 30-day rotation ---
 class ErrorLogger:
     def __init__(self, days_to_keep=30):
         self.log_dir = os.path.join(os.path.dirname(__file__), "logs")
         self.days_to_keep = days_to_keep
-        self.log_file = None
+        self.log_file = os.path.join(self.log_dir, "error.log")
         self.is_configured = False
 
     def setup_on_error(self):
-        """Create logs folder and configure logging only when an error occurs."""
+        """
+        Create logs folder and attach a daily-rotating log handler only
+        when an error occurs. Rotation keeps `days_to_keep` old files.
+        """
         if not self.is_configured:
             os.makedirs(self.log_dir, exist_ok=True)
-            self.log_file = os.path.join(
-                self.log_dir,
-                f"error_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            )
-            logging.basicConfig(
-                filename=self.log_file,
-                level=logging.ERROR,
-                format="%(asctime)s - %(levelname)s - %(message)s"
+            handler = TimedRotatingFileHandler(
+                self.log_file,
+                when="D",
+                interval=1,
+                backupCount=self.days_to_keep,
+                encoding="utf-8",
+                delay=True
             )
+            handler.setLevel(logging.ERROR)
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+            logging.getLogger().addHandler(handler)
             self.is_configured = True
         return self.log_file
 
@@ -68,23 +85,15 @@ class ErrorLogger:
         self.setup_on_error()
         logging.error(msg)
 
-    def cleanup_old_logs(self):
-        """Delete log files older than the retention period."""
-        if not os.path.exists(self.log_dir):
-            return  # Nothing to clean if folder never created
-        cutoff = datetime.now() - timedelta(days=self.days_to_keep)
-        for fname in os.listdir(self.log_dir):
-            fpath = os.path.join(self.log_dir, fname)
-            if os.path.isfile(fpath) and fname.startswith("csv_workflow_automation_error_log_"):
-                try:
-                    timestamp_str = fname.replace("csv_workflow_automation_error_log_", "").replace(".txt", "")
-                    dt = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    if dt < cutoff:
-                        os.remove(fpath)
-                        # print(f"🗑 Deleted old log file: {fname}")
-                except Exception:
-                    continue
+
 # --- Utility Functions ---
+CSV_CHUNK_ROWS = 50000  # rows per bulk write during CSV → Excel conversion
+CSV_READ_BUFFER = 1 << 20  # 1 MiB read buffer for the C-level csv parser
+UI_POLL_MS = 50         # how often the Tk thread drains worker UI updates
+RANGE_ADDRESS_LIMIT = 255  # max length of an address string passed to Range()
+WAFERMAP_CACHE_MAX_FILES = 50     # newest wafermap cache entries kept; older ones are pruned
+WAFERMAP_CACHE_MAX_AGE_DAYS = 30  # cache entries unused for longer than this are pruned
+
 def normalize_value(val):
     if val is None:
         return None
@@ -92,16 +101,85 @@ def normalize_value(val):
         return str(int(val))
     return str(val).strip()
 
+def _norm_et(v, _float=float, _int=int, _str=str):
+    """
+    Hot-path variant of normalize_value for wafermap ET cells.
+    Same output for floats and strings, but None maps to "" and the
+    type check is an exact `type(...) is float` with builtins bound as locals.
+    """
+    if v is None:
+        return ""
+    if type(v) is _float:
+        return _str(_int(v)) if v.is_integer() else _str(v)
+    return _str(v).strip()
+
+def hex_to_rgb(hex_color):
+    """Convert '#RRGGBB' to an (r, g, b) tuple."""
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def join_addresses(addresses, limit=RANGE_ADDRESS_LIMIT):
+    """
+    Join A1 addresses into comma-separated multi-area strings,
+    each short enough to pass to a single Range() call.
+    """
+    chunk, size = [], 0
+    for addr in addresses:
+        extra = len(addr) + (1 if chunk else 0)
+        if chunk and size + extra > limit:
+            yield ",".join(chunk)
+            chunk, size = [], 0
+            extra = len(addr)
+        chunk.append(addr)
+        size += extra
+    if chunk:
+        yield ",".join(chunk)
+
+def style_range(rng_api, interior, font_color, bold=False):
+    """Apply fill, font color and bold to a Range COM object in one pass."""
+    rng_api.Interior.Color = interior
+    font = rng_api.Font
+    font.Color = font_color
+    font.Bold = bold
+
+def read_value2(rng):
+    """
+    Bulk-read a range through Range.Value2 as a list of row tuples.
+    Value2 skips Excel's Date/Currency marshaling; numbers arrive as
+    floats and error cells as int codes. A single cell is wrapped too.
+    """
+    raw = rng.api.Value2
+    if not isinstance(raw, tuple):
+        return [(raw,)]
+    return list(raw)
+
 @contextmanager
-def open_workbook(path, visible=False):
-    app = xw.App(visible=visible)
-    wb = app.books.open(path)
+def frozen_app(app):
+    """
+    Turn off screen updating, events, alerts and automatic calculation
+    for the duration of a bulk Excel operation, restoring them on exit.
+    Requires at least one open workbook (Excel rejects Calculation otherwise).
+    """
+    api = app.api
+    saved = (api.ScreenUpdating, api.EnableEvents, api.Calculation, api.DisplayAlerts)
+    api.ScreenUpdating = False
+    api.EnableEvents = False
+    api.Calculation = -4135  # xlCalculationManual
+    api.DisplayAlerts = False
     try:
-        yield wb
+        yield app
     finally:
-        wb.save()
-        wb.close()
-        app.quit()
+        api.ScreenUpdating, api.EnableEvents, api.Calculation, api.DisplayAlerts = saved
+
+def user_cache_dir():
+    """
+    Persistent per-user folder for the wafermap cache.
+    %LOCALAPPDATA% on Windows (unlike the one-file .exe's _MEI* folder,
+    it survives between runs); ~/.cache elsewhere.
+    """
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "CSV Workflow Automation", "wafermap_cache")
+
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and PyInstaller"""
     try:
@@ -110,13 +188,44 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# --- Wafermap Colors ---
+# C1_MARK → fill color used for deterministic wafermap coloring
+COLOR_MAP = {
+    "/":"#00FF00", "$":"#7B68EE", "*":"#87CEEB", "?":"#66FF66", "=":"#7FFFD4", "!":"#6495ED", "#":"#6A5ACD",
+    "%":"#66FF66", ".":"#66FF66", ":":"#66FF66", "^":"#66FF66", "+":"#66FF66", "-":"#66FF66", "{":"#66FF66",
+    "}":"#66FF66", "(":"#66FF66", ")":"#66FF66", "_":"#66FF66", "|":"#66FF66", ";":"#66FF66", "@":"#66FF66",
+    "\\":"#66FF66", "<":"#66FF66", ">":"#66FF66", "&":"#66FF66",
+    "0":"#66FF66", "1":"#FFFF99", "2":"#FF0000", "3":"#FFFFE0", "4":"#ADD8E6", "5":"#FF8080", "6":"#AFEEEE",
+    "7":"#99CCFF", "8":"#FFCC00", "9":"#FFFF00",
+    "A":"#2E8B57", "B":"#FFCC00", "C":"#FFCC00", "D":"#99CC00", "E":"#99CC00", "F":"#7CFC00", "G":"#FFFF00",
+    "H":"#A6A6A6", "I":"#00CCFF", "J":"#32CD32", "K":"#20B2AA", "L":"#FFDEAD", "M":"#D9D9D9", "N":"#DAA520",
+    "O":"#00CCFF", "P":"#FFFF99", "Q":"#ED7D31", "R":"#FFCC00", "S":"#FF7C80", "T":"#FFCC00", "U":"#00CCFF",
+    "V":"#008080", "W":"#008080", "X":"#008080", "Y":"#666699", "Z":"#666699",
+    "a":"#D2691E", "b":"#993366", "c":"#A52A2A", "d":"#E9967A", "e":"#660066", "f":"#ED7D31", "g":"#3366FF",
+    "h":"#CCFFFF", "i":"#FF7F50", "j":"#99CCFF", "k":"#CCCCFF", "l":"#D9D9D9", "m":"#969696", "n":"#339966",
+    "o":"#333399", "p":"#FF6600", "q":"#FFFF00", "r":"#0066CC", "s":"#FF9900", "t":"#33CCCC", "u":"#008080",
+    "v":"#EE82EE", "w":"#DDA0DD", "x":"#00FFFF", "y":"#99CC00", "z":"#9932CC"
+}
+
+# Packed once at load so the coloring loop is a single dict lookup per cell
+C1_TO_RGBINT = {mark: xw.utils.rgb_to_int(hex_to_rgb(hex_color)) for mark, hex_color in COLOR_MAP.items()}
+GREY_INT = xw.utils.rgb_to_int((200, 200, 200))  # fallback for unmapped / unknown marks
+WAFERMAP_HEADER_FILL_INT = xw.utils.rgb_to_int((228, 241, 253))  # wafermap X/Y header fill
+WAFERMAP_HEADER_FONT_INT = xw.utils.rgb_to_int((46, 110, 158))   # wafermap X/Y header font (dark blue)
+
+# --- Pivot / End Test Colors ---
+# Fill colors for the fallout and End Test tables, packed once for .api.Interior.Color
+PIVOT_HEADER_FILL_INT = xw.utils.rgb_to_int((192, 230, 245))  # light blue
+TOP_FAIL_FILL_INT = xw.utils.rgb_to_int((255, 159, 159))      # light red
+WHITE_FILL_INT = xw.utils.rgb_to_int((255, 255, 255))         # white
+
 # --- GUI Class ---
 class CSVWorkflowAutomationGUI:
     """
     Main GUI class for the CSV Workflow Automation tool.
     Handles user interface, workflow execution, and error logging.
     """
-    def __init__(self, root):
+    def __init__(self, root, use_cache=True):
         """
         Initialize the GUI, set theme, and build all frames.
 
@@ -124,6 +233,7 @@ class CSVWorkflowAutomationGUI:
         - Loads custom sprout.ico icon for branding.
           Falls back gracefully if the icon file is missing.
         - Builds title frame, developer credit, and main interface sections.
+        - use_cache=False disables the on-disk wafermap cache (--no-cache).
         """
         self.root = root
         self.root.title("CSV Workflow Automation")
@@ -146,6 +256,28 @@ class CSVWorkflowAutomationGUI:
         # Initialize error logger
         self.logger = ErrorLogger()
 
+        # Per-sheet lookup caches (header index, used-range bounds)
+        self._reset_sheet_caches()
+
+        # On-disk wafermap cache, keyed by the source CSV's path/size/mtime
+        self.use_cache = use_cache
+        self.cache_dir = user_cache_dir()
+        self.csv_path = None
+
+        # Long-lived hidden Excel session, reused across GUI actions
+        self._app = None
+        self._wb = None
+        self._wb_path = None
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
+
+        # Single COM-initialized worker: all Excel calls run off the Tk thread
+        # and stay on the thread that created the Excel instance.
+        self.executor = ThreadPoolExecutor(max_workers=1, initializer=pythoncom.CoInitialize)
+        self._pending = set()  # submitted actions not yet finished (cancelled on Exit)
+        self._ui_queue = queue.Queue()
+        self._status_buffer = []  # (message, color) lines held back until _flush_status
+        self.root.after(UI_POLL_MS, self._process_ui_queue)
+
         # --- Title Frame ---
         title_frame = tk.Frame(self.root, bg=self.bg_color)
         title_frame.pack(pady=(10,0))
@@ -186,16 +318,125 @@ class CSVWorkflowAutomationGUI:
 
 
     # --- Helper Methods ---
+    def _reset_sheet_caches(self):
+        """Drop per-sheet lookups when a new workbook is loaded or cleared."""
+        self._header_cache = {}  # {sheet_name: {col_letter: {HEADER: row}}}
+        self._used_bounds = {}   # {sheet_name: (last used row, last used col)}
+        self._testno_cache = {}  # {(sheet_name, lolimit_row): {TESTNO: row}}
+
+    def used_bounds(self, sheet):
+        """
+        Return (last row, last column) of the sheet's used range.
+        Read once per sheet via UsedRange and cached.
+        """
+        bounds = self._used_bounds.get(sheet.name)
+        if bounds is None:
+            used = sheet.api.UsedRange
+            bounds = (used.Row + used.Rows.Count - 1, used.Column + used.Columns.Count - 1)
+            self._used_bounds[sheet.name] = bounds
+        return bounds
+
+    def last_used_row(self, sheet):
+        """Return the last row of the sheet's used range (cached)."""
+        return self.used_bounds(sheet)[0]
+
     def find_header_row(self, sheet, col_letter, header_name):
         """
         Scan a given column for a header name and return its row index.
+        The column is read once (bounded by the used range) and indexed,
+        so later lookups on the same sheet are served from the cache.
         Returns None if not found.
         """
-        col_values = sheet.range(f"{col_letter}1:{col_letter}{sheet.cells.last_cell.row}").value
-        for i, val in enumerate(col_values, start=1):
-            if str(val).strip().upper() == header_name.upper():
-                return i
-        return None
+        sheet_cache = self._header_cache.setdefault(sheet.name, {})
+        header_index = sheet_cache.get(col_letter)
+        if header_index is None:
+            last_row = self.last_used_row(sheet)
+            col_values = sheet.range(f"{col_letter}1:{col_letter}{last_row}").options(ndim=1).value
+            header_index = {}
+            for i, val in enumerate(col_values, start=1):
+                if val is not None:
+                    header_index.setdefault(str(val).strip().upper(), i)
+            sheet_cache[col_letter] = header_index
+        return header_index.get(header_name.upper())
+
+    # --- Excel Session ---
+    def _excel_alive(self):
+        """Return True if the cached Excel instance still answers COM calls."""
+        try:
+            self._app.api.Version  # cheap round-trip; raises once EXCEL.EXE is gone
+            return True
+        except Exception:
+            return False
+
+    def _get_app(self):
+        """
+        Return the cached hidden Excel instance, starting it on first use.
+        If the process has crashed or been killed, its handles are dropped
+        and a fresh instance is started instead.
+        """
+        if self._app is not None and not self._excel_alive():
+            self.logger.log_error("Hidden Excel instance is no longer running; starting a new one.")
+            self._app = None
+            self._wb = None
+            self._wb_path = None
+            self._reset_sheet_caches()
+        if self._app is None:
+            self._app = xw.App(visible=False, add_book=False)
+        return self._app
+
+    def _get_wb(self):
+        """
+        Return the workbook for self.out_file.
+        Opens it in the cached Excel instance on first use and reuses
+        the open handle for every later action on the same file.
+        """
+        app = self._get_app()  # also drops a dead Excel instance and its workbook
+        if self._wb is not None and self._wb_path == self.out_file:
+            return self._wb
+        self._close_wb()
+        self._wb = app.books.open(self.out_file)
+        self._wb_path = self.out_file
+        return self._wb
+
+    @contextmanager
+    def excel_session(self, save=False):
+        """
+        Yield the cached workbook with Excel frozen for bulk work.
+        With save=True the workbook is saved once the block finishes
+        without error, after Excel's settings are restored, so the file
+        never records manual calculation. The workbook stays open
+        afterwards; it is only closed by _close_wb (Clear All, Exit,
+        or switching files).
+        """
+        wb = self._get_wb()
+        with frozen_app(wb.app):
+            yield wb
+        if save:
+            wb.save()
+
+    def _close_wb(self):
+        """Save and close the cached workbook, keeping Excel running."""
+        if self._wb is None:
+            return
+        try:
+            self._wb.save()
+            self._wb.close()
+        finally:
+            self._wb = None
+            self._wb_path = None
+
+    def _shutdown_excel(self):
+        """Close the cached workbook and quit the hidden Excel instance."""
+        try:
+            self._close_wb()
+        except Exception as e:
+            self.logger.log_error(f"Failed to close workbook: {e}")
+        if self._app is not None:
+            try:
+                self._app.quit()
+            except Exception:
+                pass
+            self._app = None
 
     # --- GUI Builders ---
     def create_file_selection_frame(self):
@@ -289,14 +530,9 @@ class CSVWorkflowAutomationGUI:
         """
         Clean and deduplicate C1_MARK values.
         Flattens nested lists, normalizes values, and removes duplicates.
+        Duplicates are dropped before normalizing, so each distinct raw
+        value is normalized only once.
         """
-        def normalize(i):
-            if i is None:
-                return None
-            if isinstance(i, float) and i.is_integer():
-                return str(int(i))   # 1.0 → "1"
-            return str(i).strip()
-
         flat = []
         for item in raw_items:
             if isinstance(item, list):
@@ -304,9 +540,10 @@ class CSVWorkflowAutomationGUI:
             elif item is not None:
                 flat.append(item)
 
-        cleaned = [normalize(i) for i in flat if i is not None]
-        unique = list(dict.fromkeys(cleaned))
-        return unique
+        # Dedupe raw values first (C-level hashing), then normalize the
+        # few survivors and dedupe again: 1.0 and "1" both map to "1".
+        distinct_raw = dict.fromkeys(i for i in flat if i is not None)
+        return list(dict.fromkeys(map(normalize_value, distinct_raw)))
     
     def create_status_box(self):
         """
@@ -336,26 +573,89 @@ class CSVWorkflowAutomationGUI:
         frame = tk.Frame(self.root, bg=self.bg_color)
         frame.pack(fill="x", side="bottom", padx=15, pady=5)
         tk.Button(frame, text="EXIT", width=12, bg="#d32f2f", fg="white",
-                  command=self.root.destroy).pack(side="right", pady=10)
+                  command=self.exit_app).pack(side="right", pady=10)
         tk.Button(frame, text="Clear All", width=12, command=self.clear_all,
                   bg="#ffcccc", fg=self.fg_color, activebackground=self.btn_active).pack(side="right", padx=10)
 
+    # --- Background Execution ---
+    def run_in_background(self, func, *args):
+        """Run a workflow action on the Excel worker thread."""
+        future = self.executor.submit(func, *args)
+        self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        """Report any error that escaped an action's own handling."""
+        self._pending.discard(future)
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            self.logger.setup_on_error()
+            logging.critical(f"Unexpected error: {exc}", exc_info=exc)
+            self.show_status(f"❌ Unexpected error: {exc}", color="#d32f2f")
+
+    def _call_in_ui(self, func, *args):
+        """Queue func(*args) to run on the Tk main thread."""
+        self._ui_queue.put((func, args))
+
+    def _process_ui_queue(self):
+        """Drain UI updates posted by the worker, then re-arm the poll."""
+        try:
+            while True:
+                func, args = self._ui_queue.get_nowait()
+                func(*args)
+        except queue.Empty:
+            pass
+        finally:
+            # Re-arm even if a queued update raised, so polling never stops
+            self.root.after(UI_POLL_MS, self._process_ui_queue)
+
     # --- Status Logging ---
     def show_status(self, message, color="#000000", clear=False):
         """
         Display a message in the status box.
         Supports optional color coding and clearing previous logs.
+        Safe to call from the worker thread (forwarded to the Tk thread).
         """
+        if threading.current_thread() is not threading.main_thread():
+            self._call_in_ui(self.show_status, message, color, clear)
+            return
         self.status_box.config(state="normal")
         if clear:
             self.status_box.delete("1.0", "end")
         if message:
-            self.status_box.insert("end", message + "\n")
-            line_tag = f"status_{self.status_box.index('end-2l')}"
-            self.status_box.tag_add(line_tag, self.status_box.index("end-2l"), self.status_box.index("end-1c"))
-            self.status_box.tag_config(line_tag, foreground=color)
+            self._insert_status_line(message, color)
+        self.status_box.config(state="disabled")
+
+    def _insert_status_line(self, message, color):
+        """Append one colored line to the (already editable) status box."""
+        self.status_box.insert("end", message + "\n")
+        line_tag = f"status_{self.status_box.index('end-2l')}"
+        self.status_box.tag_add(line_tag, self.status_box.index("end-2l"), self.status_box.index("end-1c"))
+        self.status_box.tag_config(line_tag, foreground=color)
+
+    def _write_status_lines(self, lines):
+        """Append several (message, color) lines in a single status box update."""
+        self.status_box.config(state="normal")
+        for message, color in lines:
+            self._insert_status_line(message, color)
         self.status_box.config(state="disabled")
 
+    def _flush_status(self):
+        """
+        Post buffered status lines as one UI update.
+        Call at phase boundaries; a no-op when nothing is buffered.
+        """
+        if not self._status_buffer:
+            return
+        lines, self._status_buffer = self._status_buffer, []
+        if threading.current_thread() is not threading.main_thread():
+            self._call_in_ui(self._write_status_lines, lines)
+        else:
+            self._write_status_lines(lines)
+
     # --- File Handling ---
     def browse_file(self):
         """
@@ -369,36 +669,58 @@ class CSVWorkflowAutomationGUI:
 
     def convert_to_excel(self):
         """
-        Convert selected CSV file to Excel (.xlsx).
-        Normalizes ragged rows, writes in bulk, and saves output.
+        Validate the CSV selection and run the conversion
+        on the Excel worker thread.
         """
         file_path = self.path_var.get()
         if not file_path:
             self.show_status("⚠️ No file selected.", color="#d32f2f")
             return
+        self.run_in_background(self._convert_to_excel_impl, file_path)
+
+    def _convert_to_excel_impl(self, file_path):
+        """
+        Convert selected CSV file to Excel (.xlsx).
+        Normalizes ragged rows, writes in bulk, and saves output.
+        """
+        wb = None
         try:
             sheet_name = os.path.splitext(os.path.basename(file_path))[0]
             out_file = os.path.splitext(file_path)[0] + ".xlsx"
-            app = xw.App(visible=False)
+            self._close_wb()
+            app = self._get_app()
             wb = app.books.add()
             sht = wb.sheets[0]
             sht.name = sheet_name[:31]
 
-            with open(file_path, newline='', encoding='utf-8') as f:
-                reader = list(csv.reader(f))
-            max_len = max(len(row) for row in reader)
-            normalized = [row + [""] * (max_len - len(row)) for row in reader]
-            sht.range("A1").value = normalized
+            # --- Stream CSV in fixed-size chunks to keep memory bounded ---
+            offset = 1
+            with frozen_app(app), open(file_path, newline='', encoding='utf-8',
+                                       buffering=CSV_READ_BUFFER) as f:
+                reader = csv.reader(f)  # stdlib _csv: C tokenizer, keeps ragged rows
+                for rows in iter(lambda: list(islice(reader, CSV_CHUNK_ROWS)), []):
+                    self.write_csv_chunk(sht, offset, rows)
+                    offset += len(rows)
 
             wb.save(out_file)
-            wb.close()
-            app.quit()
 
+            # Keep the new workbook open for the follow-up actions
+            self._wb = wb
+            self._wb_path = out_file
             self.out_file = out_file
             self.sheet_name = sheet_name
+            self.csv_path = file_path
+            self._reset_sheet_caches()
             self.extract_filter_items()
             self.show_status(f"\n✅ Conversion complete: {out_file}")
         except Exception as e:
+            # Don't leave a half-written, unsaved book behind in the hidden Excel
+            if wb is not None and wb is not self._wb:
+                try:
+                    wb.close()
+                except Exception:
+                    pass
+
             # Ensure logger is configured
             self.logger.setup_on_error()
 
@@ -410,6 +732,17 @@ class CSVWorkflowAutomationGUI:
 
 
 
+    def write_csv_chunk(self, sheet, offset, rows):
+        """
+        Pad a chunk of ragged CSV rows in place to a rectangle and
+        write it in one bulk call starting at row `offset`, Column A.
+        """
+        max_len = max(map(len, rows))
+        for row in rows:
+            if len(row) < max_len:
+                row.extend(repeat("", max_len - len(row)))  # no temporary padding list
+        sheet.range((offset, 1)).value = rows
+
     # --- Placeholder Methods (to be filled with your existing logic) ---
     def extract_filter_items(self):
         """
@@ -417,19 +750,23 @@ class CSVWorkflowAutomationGUI:
         Populates the combobox with deduplicated filter items.
         """
         try:
-            with open_workbook(self.out_file) as wb_xlw:
+            with self.excel_session() as wb_xlw:
                 sht = wb_xlw.sheets[0]
                 header_row = self.find_header_row(sht, "G", "C1_MARK")
                 if not header_row:
                     self.show_status("❌ 'C1_MARK' not found in Column G.", color="#d32f2f")
                     return
 
-                last_row = sht.range((header_row, 7)).end("down").row
-                raw_items = sht.range((header_row+1, 7), (last_row, 7)).value
+                last_row = self.last_used_row(sht)
+                if last_row > header_row:
+                    raw_items = sht.range((header_row+1, 7), (last_row, 7)).value
+                    raw_items = raw_items if isinstance(raw_items, list) else [raw_items]
+                else:
+                    raw_items = []
                 self.raw_items = raw_items
 
                 unique_items = self.get_unique_c1_mark_values(self.raw_items)
-                self.filter_dropdown['values'] = unique_items
+                self._call_in_ui(self.filter_dropdown.configure, {"values": unique_items})
                 self.base_name = self.get_unique_c1_mark_values([self.sheet_name])[0]
 
                 #self.show_status("✅ Combobox populated with filter items.")
@@ -445,20 +782,25 @@ class CSVWorkflowAutomationGUI:
     
     def generate_pivot(self):
         """
-        Generate a pivot table filtered by selected C1_MARK.
-        Builds fallout table with counts and percentages.
-        Applies formatting and previews results in status box.
+        Validate the C1_MARK selection and generate the pivot table
+        on the Excel worker thread.
         """
-
         selected = self.filter_var.get()
         if not selected:
             self.show_status("⚠️ Please select a C1_MARK value first.", color="#d32f2f")
             return
 
         self.show_status(f"\nℹ️ Generating pivot table...")
+        self.run_in_background(self._generate_pivot_impl, selected)
 
+    def _generate_pivot_impl(self, selected):
+        """
+        Generate a pivot table filtered by selected C1_MARK.
+        Builds fallout table with counts and percentages.
+        Applies formatting and previews results in status box.
+        """
         try:
-            with open_workbook(self.out_file) as wb_xlw:
+            with self.excel_session(save=True) as wb_xlw:
                 sht = wb_xlw.sheets[self.base_name]
 
                 # --- Find C1_MARK header row ---
@@ -477,8 +819,8 @@ class CSVWorkflowAutomationGUI:
                 if not et_col:
                     raise ValueError("'ET' column not found to the right of C1_MARK")
 
-                # --- Define pivot source range ---
-                last_row = sht.range((header_row, 7)).end("down").row
+                # --- Define pivot source range (same used-range bound as the filter list and wafermap) ---
+                last_row = self.last_used_row(sht)
                 pivot_range = sht.range((header_row, 7), (last_row, et_col))
 
                 # --- Create Pivot sheet ---
@@ -490,33 +832,35 @@ class CSVWorkflowAutomationGUI:
 
                 # --- Create pivot cache and table ---
                 pivot_cache = wb_xlw.api.PivotCaches().Create(SourceType=1, SourceData=pivot_range.api)
+                pivot_cache.MissingItemsLimit = 0  # xlMissingItemsNone
                 table_name = f"PivotTable_{datetime.now().strftime('%Y%m%d%H%M%S')}"
                 pivot_table = pivot_cache.CreatePivotTable(TableDestination=pivot_sheet.range("A3").api, TableName=table_name)
+                pivot_table.ManualUpdate = True  # defer recalculation until all fields are placed
+                try:
+                    # --- Filter: C1_MARK ---
+                    pf = pivot_table.PivotFields("C1_MARK")
+                    pf.Orientation = 3
+                    valid_items = [item.Name for item in pf.PivotItems()]
+                    if selected in valid_items:
+                        pf.CurrentPage = selected
+                        self.show_status(f"\nApplied filter: {selected}")
+                    else:
+                        self.show_status(f"⚠️ Selected '{selected}' not found in C1_MARK items {valid_items}", color="#d32f2f")
+                        return
 
-                # --- Filter: C1_MARK ---
-                pf = pivot_table.PivotFields("C1_MARK")
-                pf.Orientation = 3
-                valid_items = [item.Name for item in pf.PivotItems()]
-                if selected in valid_items:
-                    pf.CurrentPage = selected
-                    self.show_status(f"\nApplied filter: {selected}")
-                else:
-                    self.show_status(f"⚠️ Selected '{selected}' not found in C1_MARK items {valid_items}", color="#d32f2f")
-                    return
-
-                # --- Rows: ET ---
-                pivot_table.PivotFields("ET").Orientation = 1
+                    # --- Rows: ET ---
+                    pivot_table.PivotFields("ET").Orientation = 1
 
-                # --- Values: Count of FT ---
-                pivot_table.AddDataField(pivot_table.PivotFields("FT"), "Count of FT", -4112)
+                    # --- Values: Count of FT ---
+                    pivot_table.AddDataField(pivot_table.PivotFields("FT"), "Count of FT", -4112)
+                finally:
+                    # Single refresh with the final layout; never leave the saved pivot in manual mode
+                    pivot_table.ManualUpdate = False
 
                 # --- Fallout Table Logic ---
                 data = pivot_sheet.range("A4").expand().value
-                theoretical_num = None
-                for i, val in enumerate(sht.range("A:A").value, start=1):
-                    if str(val).strip().upper() == "THEORETICAL_NUM":
-                        theoretical_num = sht.range((i, 1)).offset(0, 2).value
-                        break
+                theoretical_row = self.find_header_row(sht, "A", "THEORETICAL_NUM")
+                theoretical_num = sht.range((theoretical_row, 3)).value if theoretical_row else None
 
                 fallout_table = []
                 for row in data:
@@ -535,32 +879,28 @@ class CSVWorkflowAutomationGUI:
                 # --- Vectorized write fallout table ---
                 pivot_sheet.range("D3").value = fallout_table
 
-                # --- Apply formatting ---
+                # --- Apply formatting (one api handle per range) ---
                 last_row_ft = 3 + len(fallout_table) - 1
-                fallout_range = pivot_sheet.range(f"D3:F{last_row_ft}")
-                fallout_range.api.HorizontalAlignment = -4108
-                fallout_range.api.VerticalAlignment = -4108
-                fallout_range.api.IndentLevel = 0
-
-                # Header row
-                pivot_sheet.range("D3:F3").color = (192, 230, 245)
-                pivot_sheet.range("D3:F3").api.Font.Bold = True
-                # First data row
-                pivot_sheet.range("D4:F4").color = (255, 159, 159)
-                pivot_sheet.range("D4:F4").api.Font.Bold = True
-                # Grand Total row
-                pivot_sheet.range(f"D{last_row_ft}:F{last_row_ft}").color = (192, 230, 245)
-                pivot_sheet.range(f"D{last_row_ft}:F{last_row_ft}").api.Font.Bold = True
-
-                fallout_range.api.Borders.Weight = 2
-                wb_xlw.save()
+                fallout_api = pivot_sheet.range(f"D3:F{last_row_ft}").api
+                fallout_api.HorizontalAlignment = -4108
+                fallout_api.VerticalAlignment = -4108
+                fallout_api.IndentLevel = 0
+                fallout_api.Borders.Weight = 2
+
+                for address, fill in (
+                    ("D3:F3", PIVOT_HEADER_FILL_INT),                             # Header row
+                    ("D4:F4", TOP_FAIL_FILL_INT),                                 # First data row
+                    (f"D{last_row_ft}:F{last_row_ft}", PIVOT_HEADER_FILL_INT),    # Grand Total row
+                ):
+                    row_api = pivot_sheet.range(address).api
+                    row_api.Interior.Color = fill
+                    row_api.Font.Bold = True
 
                 # --- Show fallout table in status box ---
-                self.status_box.config(state="normal")
-                self.status_box.insert(tk.END, "\nPreview Table:\n")
+                preview = ["\nPreview Table:"]
                 for et_val, count_val, fallout_val in fallout_table:
-                    self.status_box.insert(tk.END, f"{str(et_val):<15}{str(count_val):<10}{str(fallout_val)}\n")
-                self.status_box.config(state="disabled")
+                    preview.append(f"{str(et_val):<15}{str(count_val):<10}{str(fallout_val)}")
+                self.show_status("\n".join(preview))
 
                 self.show_status(f"\n✅ Successfully generated table for C1_MARK: {selected}")
 
@@ -575,12 +915,16 @@ class CSVWorkflowAutomationGUI:
             self.show_status(f"❌ Unexpected error: {e}", color="#d32f2f")
             
     def check_end_test(self):
+        """Run the End Test No. check on the Excel worker thread."""
+        self.run_in_background(self._check_end_test_impl)
+
+    def _check_end_test_impl(self):
         """
         Check End Test No. against reference table.
         Displays limits and highlights results in status box.
         """
         try:
-            with open_workbook(self.out_file) as wb_xlw:
+            with self.excel_session(save=True) as wb_xlw:
                 # --- Ensure Pivot sheet exists ---
                 try:
                     pivot_sheet = wb_xlw.sheets["Pivot"]
@@ -604,22 +948,27 @@ class CSVWorkflowAutomationGUI:
                 if str(lolimit_val).strip().upper() != "LOLIMIT":
                     raise ValueError("LOLIMIT not found in Column F")
 
-                # --- Expand reference table ---
-                ref_range = data_sheet.range((lolimit_row, 1)).expand("table")
+                # --- TESTNO → row index, built once per reference table ---
+                cache_key = (data_sheet.name, lolimit_row)
+                testno_map = self._testno_cache.get(cache_key)
+                if testno_map is None:
+                    # --- Expand reference table ---
+                    ref_range = data_sheet.range((lolimit_row, 1)).expand("table")
 
-                # --- Locate TESTNO column (Column B) ---
-                testno_values = data_sheet.range(
-                    (lolimit_row + 1, 2),
-                    (lolimit_row + ref_range.rows.count - 1, 2)
-                ).value
+                    # --- Locate TESTNO column (Column B) ---
+                    testno_values = data_sheet.range(
+                        (lolimit_row + 1, 2),
+                        (lolimit_row + ref_range.rows.count - 1, 2)
+                    ).options(ndim=1).value
 
-                # Normalize TESTNO values
-                testno_values = [normalize_value(v) if v else "" for v in testno_values]
+                    # Normalize TESTNO values (first occurrence wins)
+                    testno_map = {}
+                    for i, v in enumerate(testno_values, start=lolimit_row + 1):
+                        if v:
+                            testno_map.setdefault(normalize_value(v), i)
+                    self._testno_cache[cache_key] = testno_map
 
-                found_row = None
-                if end_test_no in testno_values:
-                    idx = testno_values.index(end_test_no) + lolimit_row + 1
-                    found_row = idx
+                found_row = testno_map.get(end_test_no)
 
                 # --- Vectorized write of header + data ---
                 start_cell = pivot_sheet.range("H3")
@@ -632,36 +981,24 @@ class CSVWorkflowAutomationGUI:
                     pivot_sheet.range("H3").value = [header, row_values]
 
                     # --- Apply formatting ---
-                    ref_range_excel = pivot_sheet.range("H3:M4")
-                    header_range = pivot_sheet.range("H3:M3")
-                    data_range = pivot_sheet.range("H4:M4")
-
-                    header_range.color = (192, 230, 245)   # light blue
-                    header_range.api.Font.Bold = True
-                    data_range.color = (255, 255, 255)     # white
-                    data_range.api.Font.Bold = True
+                    ref_api = pivot_sheet.range("H3:M4").api
+                    ref_api.Font.Bold = True
+                    ref_api.Borders.Weight = 2
+                    ref_api.HorizontalAlignment = -4108
+                    ref_api.VerticalAlignment = -4108
+                    ref_api.IndentLevel = 0
 
-                    ref_range_excel.api.Borders.Weight = 2
-                    ref_range_excel.api.HorizontalAlignment = -4108
-                    ref_range_excel.api.VerticalAlignment = -4108
-                    ref_range_excel.api.IndentLevel = 0
-
-                    wb_xlw.save()
+                    pivot_sheet.range("H3:M3").api.Interior.Color = PIVOT_HEADER_FILL_INT
+                    pivot_sheet.range("H4:M4").api.Interior.Color = WHITE_FILL_INT
 
                     # --- Show End Test No. table in status box ---
-                    self.status_box.config(state="normal")
-                    self.status_box.insert(tk.END, "\nEnd Test No. Reference:\n")
-                    self.status_box.insert(
-                        tk.END,
-                        f"{'TSNO':<10}{'TESTNO':<10}{'COMMENT':<15}{'MODE':<10}{'HILIMIT':<10}{'LOLIMIT'}\n"
-                    )
-                    self.status_box.insert(tk.END, "-" * 70 + "\n")
                     tsno, testno, comment, mode, hilimit, lolimit = row_values
-                    self.status_box.insert(
-                        tk.END,
-                        f"{tsno:<10}{testno:<10}{comment:<15}{mode:<10}{hilimit:<10}{lolimit}\n"
-                    )
-                    self.status_box.config(state="disabled")
+                    self.show_status("\n".join([
+                        "\nEnd Test No. Reference:",
+                        f"{'TSNO':<10}{'TESTNO':<10}{'COMMENT':<15}{'MODE':<10}{'HILIMIT':<10}{'LOLIMIT'}",
+                        "-" * 70,
+                        f"{tsno:<10}{testno:<10}{comment:<15}{mode:<10}{hilimit:<10}{lolimit}",
+                    ]))
 
                     # --- Status message depending on limits ---
                     if lolimit != "":
@@ -685,250 +1022,332 @@ class CSVWorkflowAutomationGUI:
         """
         Build a dictionary mapping End Test (ET) values to C1_MARK values.
         Normalizes both ET and C1_MARK for consistent lookup.
+        Reads only the two needed columns, one bulk call each, as
+        parallel lists (no columns in between are transferred).
         """
-        et_to_c1 = {}
-        last_row = sheet.range((header_row+1, et_col)).end("down").row
-        for row in range(header_row+1, last_row+1):
-            et_val = sheet.range((row, et_col)).value
-            c1_val = sheet.range((row, 7)).value  # Column G = C1_MARK
+        last_row = self.last_used_row(sheet)
+
+        # --- Two-column fetch (Value2): Column G (C1_MARK) and the ET column ---
+        c1_rows = read_value2(sheet.range((header_row+1, 7), (last_row, 7)))
+        et_rows = read_value2(sheet.range((header_row+1, et_col), (last_row, et_col)))
+
+        # --- Collapse to distinct raw ETs first (later rows win) ---
+        # Re-inserting a repeated key moves it to the end, so dict order follows
+        # the last row each raw ET appeared on; 1.0 and "1" then normalize to the
+        # same key and the later of the two still wins, as per-row normalizing did.
+        raw_pairs = {}
+        for (c1_val,), (et_val,) in zip(c1_rows, et_rows):
             if et_val is None or c1_val is None:
                 continue
+            raw_pairs.pop(et_val, None)
+            raw_pairs[et_val] = c1_val
 
-            # Normalize ET
-            if isinstance(et_val, float) and et_val.is_integer():
-                et_str = str(int(et_val))
-            else:
-                et_str = str(et_val).strip()
-
-            # Normalize C1_MARK
-            if isinstance(c1_val, float) and c1_val.is_integer():
-                c1_str = str(int(c1_val))
-            else:
-                c1_str = str(c1_val).strip()
-
-            et_to_c1[et_str] = c1_str
-        return et_to_c1
+        # --- Normalize once per distinct ET instead of once per die ---
+        return {normalize_value(et): normalize_value(c1) for et, c1 in raw_pairs.items()}
     
     def generate_wafermap(self):
+        """Run the wafermap build on the Excel worker thread."""
+        self.run_in_background(self._generate_wafermap_impl)
+
+    def build_wafermap_grid(self, sheet, header_row, x_col, y_col, et_col):
         """
-        Create a wafermap sheet by building an ET→C1_MARK mapping,
-        generating a pivot table with X/Y coordinates, and applying
-        deterministic cell coloring based on the predefined color_map.
+        Build the wafermap block: minimum ET per (Y, X) die position.
+        Same shape as the former "Min of ET" pivot output:
+        ["No.", x1, x2, ...] followed by [y, et, et, ...] per Y value,
+        with None where a position has no numeric ET.
+        """
+        last_row = self.last_used_row(sheet)
+        if last_row <= header_row:
+            return [["No."]]
+
+        # --- One bulk read (Value2) spanning the X, Y and ET columns ---
+        first_col, last_col = min(x_col, y_col, et_col), max(x_col, y_col, et_col)
+        block = read_value2(sheet.range((header_row+1, first_col), (last_row, last_col)))
+        xi, yi, ei = x_col - first_col, y_col - first_col, et_col - first_col
+
+        xs, ys, min_et = set(), set(), {}
+        for row in block:
+            x, y, et = row[xi], row[yi], row[ei]
+            if x is None or y is None:
+                continue
+            xs.add(x)
+            ys.add(y)
+            if type(et) is float:  # like Excel's Min: text, blanks and error codes (ints) are ignored
+                key = (y, x)
+                if key not in min_et or et < min_et[key]:
+                    min_et[key] = et
+
+        # Pivot item order: numbers ascending, then text
+        xs = sorted(xs, key=lambda v: (isinstance(v, str), v))
+        ys = sorted(ys, key=lambda v: (isinstance(v, str), v))
+        return [["No."] + xs] + [[y] + [min_et.get((y, x)) for x in xs] for y in ys]
+
+    # --- Wafermap Cache ---
+    def wafermap_cache_path(self, data_sheet, sheet_name):
+        """
+        Return the cache file for the current input and wafermap sheet.
+        Keyed cheaply by the source CSV's path, size and mtime plus the
+        data sheet's used bounds (no file contents are read).
+        Returns None (cache miss) when caching is disabled, no CSV is
+        loaded, or the CSV can no longer be stat'ed.
         """
+        if not self.use_cache or not self.csv_path:
+            return None
+        try:
+            st = os.stat(self.csv_path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(self.csv_path)}|{st.st_size}|{st.st_mtime_ns}|{self.used_bounds(data_sheet)}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}_{sheet_name}.json")
+
+    def load_wafermap_cache(self, cache_path):
+        """
+        Load (data_block, et_to_c1) from a previous run.
+        Returns None on a cache miss or an unreadable cache file.
+        """
+        if not cache_path or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            result = cached["data_block"], cached["et_to_c1"]
+        except Exception as e:
+            self.logger.log_error(f"Ignoring unreadable wafermap cache {cache_path}: {e}")
+            return None
+        try:
+            os.utime(cache_path)  # mark as recently used so pruning keeps it
+        except OSError:
+            pass
+        return result
 
-        app = None
-        wb_xlw = None
+    def save_wafermap_cache(self, cache_path, data_block, et_to_c1):
+        """Store the wafermap grid and ET→C1_MARK map as JSON; failures are logged only."""
+        if not cache_path:
+            return
         try:
-            app = xw.App(visible=False)
-            wb_xlw = app.books.open(self.out_file)
-            data_sheet = wb_xlw.sheets[self.base_name]
-
-            # --- SLOT handling ---
-            slot_row = self.find_header_row(data_sheet, "A", "SLOT")
-            if not slot_row:
-                self.show_status("\n⚠️ SLOT header not found in Column A", color="#d32f2f")
-                return
-
-            slot_val = data_sheet.range((slot_row+1, 1)).value
-            if slot_val is None:
-                self.show_status("\n⚠️ SLOT value below header is empty", color="#d32f2f")
-                return
-
-            slot_str = str(int(slot_val)).zfill(2)
-            self.show_status(f"\n🔍 Generating wafermap for W #{slot_str}...")
-            sheet_name = f"W#{slot_str}_Wafermap_by_End_Test_No"
-
-            # --- Create or reuse Wafermap Pivot Table sheet ---
-            try:
-                pivot_sheet = wb_xlw.sheets["Wafermap Pivot Table"]
-                pivot_sheet.clear()
-            except:
-                pivot_sheet = wb_xlw.sheets.add("Wafermap Pivot Table", after=data_sheet)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"data_block": data_block, "et_to_c1": et_to_c1}, f)
+        except Exception as e:
+            self.logger.log_error(f"Could not write wafermap cache {cache_path}: {e}")
+        self.prune_wafermap_cache()
 
-            # --- Create or reuse slot-specific wafermap sheet ---
-            try:
-                wafermap_sheet = wb_xlw.sheets[sheet_name]
-                wafermap_sheet.clear()
-            except:
-                wafermap_sheet = wb_xlw.sheets.add(sheet_name, after=pivot_sheet)
-
-            # --- Find header row with C1_MARK ---
-            header_row = self.find_header_row(data_sheet, "G", "C1_MARK")
-            if not header_row:
-                self.show_status("❌ 'C1_MARK' not found in Column G.", color="#d32f2f")
-                return
-
-            # --- Locate X, Y, ET columns ---
-            row_values = data_sheet.range(
-                (header_row, 1),
-                (header_row, data_sheet.range((header_row, 1)).end("right").column)
-            ).value
-
-            x_col = y_col = et_col = None
-            for idx, val in enumerate(row_values, start=1):
-                if str(val).strip().upper() == "X":
-                    x_col = idx
-                elif str(val).strip().upper() == "Y":
-                    y_col = idx
-                elif str(val).strip().upper() in ["ET", "END TEST NO."]:
-                    et_col = idx
-
-            if not (x_col and y_col and et_col):
-                raise ValueError("Required columns 'X', 'Y', 'ET' not found in header row")
-
-            # --- Build ET → C1_MARK mapping using helper ---
-            et_to_c1 = self.build_et_to_c1_map(data_sheet, header_row, et_col)
-
-            # --- Create pivot cache and table ---
-            last_row = data_sheet.range((header_row+1, et_col)).end("down").row
-            pivot_range = data_sheet.range((header_row, x_col), (last_row, et_col))
-            pivot_cache = wb_xlw.api.PivotCaches().Create(SourceType=1, SourceData=pivot_range.api)
-            table_name = f"PivotTable_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            pivot_table = pivot_cache.CreatePivotTable(
-                TableDestination=pivot_sheet.range("A1").api,
-                TableName=table_name
+    def prune_wafermap_cache(self):
+        """
+        Delete cache entries unused for WAFERMAP_CACHE_MAX_AGE_DAYS, then
+        keep only the newest WAFERMAP_CACHE_MAX_FILES; failures are logged only.
+        """
+        try:
+            entries = sorted(
+                ((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.cache_dir)
+                 if entry.is_file() and entry.name.endswith(".json")),
+                reverse=True
             )
+            cutoff = time.time() - WAFERMAP_CACHE_MAX_AGE_DAYS * 86400
+            for i, (mtime, path) in enumerate(entries):
+                if i >= WAFERMAP_CACHE_MAX_FILES or mtime < cutoff:
+                    os.remove(path)
+        except OSError as e:
+            self.logger.log_error(f"Could not prune wafermap cache {self.cache_dir}: {e}")
+
+    def _generate_wafermap_impl(self):
+        """
+        Create a wafermap sheet by building an ET→C1_MARK mapping,
+        computing the minimum ET per X/Y die position, and applying
+        deterministic cell coloring based on the predefined COLOR_MAP.
+        """
 
-            # --- Configure pivot ---
-            pivot_table.PivotFields("Y").Orientation = 1
-            pivot_table.PivotFields("X").Orientation = 2
-            pivot_table.AddDataField(pivot_table.PivotFields("ET"), "Min of ET", -4139)
-            pivot_table.ColumnGrand = False
-            pivot_table.RowGrand = False
-            pivot_sheet.range("A2").value = "No."
-
-            # --- Copy pivot output ---
-            pivot_block = pivot_sheet.range("A2").expand()
-            data_block = pivot_block.value
-
-            # --- Paste values into wafermap sheet ---
-            rows = len(data_block)
-            cols = len(data_block[0])
-            wafermap_sheet.range((1,1), (rows,cols)).value = data_block
-
-            # --- Alignment ---
-            wafermap_sheet.range((1,1), (rows,cols)).api.HorizontalAlignment = -4108
-            wafermap_sheet.range((1,1), (rows,cols)).api.VerticalAlignment = -4108
-
-            # --- Find last used row/col ---
-            last_col = wafermap_sheet.range("1:1").end("right").column
-            last_row = wafermap_sheet.range("A:A").end("down").row
-
-            # --- Header formatting ---
-            dark_blue = xw.utils.rgb_to_int((46, 110, 158))
-            wafermap_sheet.range((1,1),(1,last_col)).color = (228, 241, 253)
-            wafermap_sheet.range((1,1),(1,last_col)).api.Font.Color = dark_blue
-            wafermap_sheet.range((1,1),(last_row,1)).color = (228, 241, 253)
-            wafermap_sheet.range((1,1),(last_row,1)).api.Font.Color = dark_blue
-
-            # --- Define C1_MARK color mapping dictionary ---
-            color_map = {
-                "/":"#00FF00", "$":"#7B68EE", "*":"#87CEEB", "?":"#66FF66", "=":"#7FFFD4", "!":"#6495ED", "#":"#6A5ACD",
-                "%":"#66FF66", ".":"#66FF66", ":":"#66FF66", "^":"#66FF66", "+":"#66FF66", "-":"#66FF66", "{":"#66FF66",
-                "}":"#66FF66", "(":"#66FF66", ")":"#66FF66", "_":"#66FF66", "|":"#66FF66", ";":"#66FF66", "@":"#66FF66",
-                "\\":"#66FF66", "<":"#66FF66", ">":"#66FF66", "&":"#66FF66",
-                "0":"#66FF66", "1":"#FFFF99", "2":"#FF0000", "3":"#FFFFE0", "4":"#ADD8E6", "5":"#FF8080", "6":"#AFEEEE",
-                "7":"#99CCFF", "8":"#FFCC00", "9":"#FFFF00",
-                "A":"#2E8B57", "B":"#FFCC00", "C":"#FFCC00", "D":"#99CC00", "E":"#99CC00", "F":"#7CFC00", "G":"#FFFF00",
-                "H":"#A6A6A6", "I":"#00CCFF", "J":"#32CD32", "K":"#20B2AA", "L":"#FFDEAD", "M":"#D9D9D9", "N":"#DAA520",
-                "O":"#00CCFF", "P":"#FFFF99", "Q":"#ED7D31", "R":"#FFCC00", "S":"#FF7C80", "T":"#FFCC00", "U":"#00CCFF",
-                "V":"#008080", "W":"#008080", "X":"#008080", "Y":"#666699", "Z":"#666699",
-                "a":"#D2691E", "b":"#993366", "c":"#A52A2A", "d":"#E9967A", "e":"#660066", "f":"#ED7D31", "g":"#3366FF",
-                "h":"#CCFFFF", "i":"#FF7F50", "j":"#99CCFF", "k":"#CCCCFF", "l":"#D9D9D9", "m":"#969696", "n":"#339966",
-                "o":"#333399", "p":"#FF6600", "q":"#FFFF00", "r":"#0066CC", "s":"#FF9900", "t":"#33CCCC", "u":"#008080",
-                "v":"#EE82EE", "w":"#DDA0DD", "x":"#00FFFF", "y":"#99CC00", "z":"#9932CC"
-            }
-
-            # --- Apply colors to wafermap cells using ET → C1_MARK mapping ---
-            for r in range(2, last_row+1):
-                for c in range(2, last_col+1):
-                    cell = wafermap_sheet.range((r,c))
-                    et_val = cell.value
-                    if et_val is None or str(et_val).strip() == "":
-                        continue
+        try:
+            # --- Cached workbook, with redraw/recalc/events frozen while the wafermap is built ---
+            with self.excel_session(save=True) as wb_xlw:
+                data_sheet = wb_xlw.sheets[self.base_name]
 
-                    # Normalize ET consistently
-                    if isinstance(et_val, float) and et_val.is_integer():
-                        et_str = str(int(et_val))
-                    else:
-                        et_str = str(et_val).strip()
+                # --- SLOT handling ---
+                slot_row = self.find_header_row(data_sheet, "A", "SLOT")
+                if not slot_row:
+                    self.show_status("\n⚠️ SLOT header not found in Column A", color="#d32f2f")
+                    return
 
-                    # Lookup C1_MARK from dictionary
-                    c1_mark_str = et_to_c1.get(et_str)
+                slot_val = data_sheet.range((slot_row+1, 1)).api.Value2
+                if slot_val is None:
+                    self.show_status("\n⚠️ SLOT value below header is empty", color="#d32f2f")
+                    return
 
-                    if c1_mark_str:
-                        if c1_mark_str in color_map:
-                            hex_color = color_map[c1_mark_str].lstrip("#")
-                            rgb = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-                            cell.color = rgb
-                        else:
-                            self.show_status(f"⚠️ No color mapping for C1_MARK '{c1_mark_str}'", color="#d32f2f")
-                            cell.color = (200,200,200)
-                    else:
-                        self.show_status(f"⚠️ No C1_MARK found for ET '{et_str}'", color="#d32f2f")
-                        cell.color = (200,200,200)
-                                
-            # --- Copy Row 1 (Ctrl+Shift+Right) and paste it after last used row ---
-            row1_vals = wafermap_sheet.range((1,1),(1,last_col)).value
-            wafermap_sheet.range((last_row+1,1),(last_row+1,last_col)).value = row1_vals
-            wafermap_sheet.range((last_row+1,1),(last_row+1,last_col)).color = (228,241,253)
-            wafermap_sheet.range((last_row+1,1),(last_row+1,last_col)).api.Font.Color = dark_blue
-            wafermap_sheet.range((last_row+1,1),(last_row+1,last_col)).api.Font.Bold = True  # bold copy of Row 1
-
-            # --- Copy Column A (Ctrl+Shift+Down) and paste it after last used column ---
-            colA_vals = wafermap_sheet.range((1,1),(last_row,1)).value
-
-            # Ensure values are shaped as a column (list of lists)
-            if isinstance(colA_vals, list) and not isinstance(colA_vals[0], list):
-                colA_vals = [[v] for v in colA_vals]
-
-            # Paste Column A into the new rightmost column
-            wafermap_sheet.range((1,last_col+1),(last_row,last_col+1)).value = colA_vals
-            wafermap_sheet.range((1,last_col+1),(last_row,last_col+1)).color = (228,241,253)
-            wafermap_sheet.range((1,last_col+1),(last_row,last_col+1)).api.Font.Color = dark_blue
-            wafermap_sheet.range((1,last_col+1),(last_row,last_col+1)).api.Font.Bold = True  # bold copy of Column A
-
-            # --- Add "No." at the very last row of that new column ---
-            wafermap_sheet.range((last_row+1, last_col+1)).value = "No."
-            wafermap_sheet.range((last_row+1, last_col+1)).color = (228,241,253)
-            wafermap_sheet.range((last_row+1, last_col+1)).api.Font.Color = dark_blue
-            wafermap_sheet.range((last_row+1, last_col+1)).api.Font.Bold = True  # bold "No." cell
-
-            # --- Also bold the original Row 1 and Column A ---
-            wafermap_sheet.range((1,1),(1,last_col)).api.Font.Bold = True
-            wafermap_sheet.range((1,1),(last_row,1)).api.Font.Bold = True
-            
-            # --- Remove gridlines from wafermap sheet ---
-            wafermap_sheet.api.Parent.Windows(1).DisplayGridlines = False
+                slot_str = str(int(slot_val)).zfill(2)
+                self.show_status(f"\n🔍 Generating wafermap for W #{slot_str}...")
+                sheet_name = f"W#{slot_str}_Wafermap_by_End_Test_No"
 
-            # --- Alignment (center everything including mirrored row/col) ---
-            used_range = wafermap_sheet.range((1,1),(last_row+1,last_col+1))
-            used_range.api.HorizontalAlignment = -4108  # xlCenter
-            used_range.api.VerticalAlignment = -4108    # xlCenter
+                # --- Create or reuse slot-specific wafermap sheet ---
+                try:
+                    wafermap_sheet = wb_xlw.sheets[sheet_name]
+                    wafermap_sheet.clear()
+                except:
+                    wafermap_sheet = wb_xlw.sheets.add(sheet_name, after=data_sheet)
 
-            
-            # --- Borders ---
-            used_range = wafermap_sheet.range((1,1),(last_row+1,last_col+1))
-            used_range.api.Borders.Weight = 2
+                # --- Reuse the wafermap grid from a previous run on the same input ---
+                cache_path = self.wafermap_cache_path(data_sheet, sheet_name)
+                cached = self.load_wafermap_cache(cache_path)
+                if cached:
+                    data_block, et_to_c1 = cached
+                else:
+                    # --- Find header row with C1_MARK ---
+                    header_row = self.find_header_row(data_sheet, "G", "C1_MARK")
+                    if not header_row:
+                        self.show_status("❌ 'C1_MARK' not found in Column G.", color="#d32f2f")
+                        return
+
+                    # --- Locate X, Y, ET columns ---
+                    row_values = read_value2(data_sheet.range(
+                        (header_row, 1),
+                        (header_row, self.used_bounds(data_sheet)[1])
+                    ))[0]
+
+                    # Normalized header -> column index (later duplicates win, as before)
+                    header_index = {
+                        str(val).strip().upper(): idx
+                        for idx, val in enumerate(row_values, start=1)
+                    }
+                    x_col = header_index.get("X")
+                    y_col = header_index.get("Y")
+                    et_col = max(header_index.get("ET", 0), header_index.get("END TEST NO.", 0)) or None
+
+                    if not (x_col and y_col and et_col):
+                        raise ValueError("Required columns 'X', 'Y', 'ET' not found in header row")
+
+                    # --- Build ET → C1_MARK mapping using helper ---
+                    et_to_c1 = self.build_et_to_c1_map(data_sheet, header_row, et_col)
+
+                    # --- Min ET per (Y, X) die position, computed in Python ---
+                    data_block = self.build_wafermap_grid(data_sheet, header_row, x_col, y_col, et_col)
+
+                    self.save_wafermap_cache(cache_path, data_block, et_to_c1)
+
+                # --- Paste values into wafermap sheet ---
+                rows = len(data_block)
+                cols = len(data_block[0])
+                wafermap_sheet.range((1,1), (rows,cols)).api.Value2 = data_block
+
+                # --- Last used row/col come straight from the pasted block ---
+                last_row, last_col = rows, cols
+
+                # --- Resolve one ET value to a fill color (None = leave blank) ---
+                missing_et = set()   # ETs with no C1_MARK, reported once after the pass
+                missing_c1 = set()   # C1_MARKs with no color mapping
+
+                # Lookups are bound as default args so the hot path stays on locals
+                def resolve_color(et_val, _norm=_norm_et, _get_c1=et_to_c1.get,
+                                  _get_col=C1_TO_RGBINT.get, _grey=GREY_INT):
+                    # Normalize ET consistently; blank cells stay uncolored
+                    et_str = _norm(et_val)
+                    if not et_str:
+                        return None
 
-            wb_xlw.save()
-            wb_xlw.close()
-            app.quit()
-            self.show_status(f"\n✅ Wafermap created on {sheet_name} sheet.")
+                    # Lookup C1_MARK from dictionary
+                    c1_mark_str = _get_c1(et_str)
 
-            # --- Reopen workbook to safely delete pivot sheet ---
-            app = xw.App(visible=False)
-            wb_xlw = app.books.open(self.out_file)
+                    if c1_mark_str:
+                        color_int = _get_col(c1_mark_str)
+                        if color_int is None:
+                            missing_c1.add(c1_mark_str)
+                            color_int = _grey
+                    else:
+                        missing_et.add(et_str)
+                        color_int = _grey
+                    return color_int
+
+                # --- Resolve cell colors in memory from the pasted block ---
+                # data_block[r-1][c-1] holds wafermap cell (r, c); no COM reads needed.
+                # Each distinct raw ET is resolved once; repeats are one dict hit.
+                color_for = {}
+                color_grid = []
+                _resolve = resolve_color
+                _add_cell = color_grid.append
+                for r, block_row in enumerate(data_block[1:], start=2):
+                    for c, et_val in enumerate(block_row[1:], start=2):
+                        if et_val is None:
+                            continue
+                        try:
+                            color_int = color_for[et_val]
+                        except KeyError:
+                            color_int = color_for[et_val] = _resolve(et_val)
+                        if color_int is not None:
+                            _add_cell((r, c, color_int))
+
+                # --- One summary line per kind of miss instead of one per cell ---
+                # (buffered; shown together once the coloring pass is done)
+                if missing_c1:
+                    self._status_buffer.append((
+                        f"⚠️ No color mapping for {len(missing_c1)} C1_MARK value(s) (e.g. {sorted(missing_c1)[:5]})",
+                        "#d32f2f"
+                    ))
+                if missing_et:
+                    self._status_buffer.append((
+                        f"⚠️ {len(missing_et)} ET value(s) lacked C1_MARK (e.g. {sorted(missing_et)[:5]})",
+                        "#d32f2f"
+                    ))
+
+                # --- Group cells by color, merging horizontal runs (B2:E2) ---
+                buckets = defaultdict(list)  # color int -> [[row, first_col, last_col], ...]
+                for r, c, color_int in color_grid:
+                    runs = buckets[color_int]
+                    if runs and runs[-1][0] == r and runs[-1][2] == c - 1:
+                        runs[-1][2] = c
+                    else:
+                        runs.append([r, c, c])
 
-            try:
-                pivot_sheet = wb_xlw.sheets["Wafermap Pivot Table"]
-                # Activate another sheet first
-                wb_xlw.sheets[0].activate()
-                pivot_sheet.delete()
-                #self.show_status("\n🗑️ Wafermap Pivot Table sheet deleted after reopen.")
-            except Exception as e:
-                #self.show_status(f"\n⚠️ Could not delete Wafermap Pivot Table: {e}", color="#d32f2f")
-                pass
+                # --- Column letters computed once (index = column number) ---
+                col_letters = [None] + [xw.utils.col_name(i) for i in range(1, last_col + 2)]
+
+                # --- Apply colors: one multi-area Range per color (split at 255 chars) ---
+                for color_int, runs in buckets.items():
+                    addresses = (
+                        f"{col_letters[c1]}{r}" if c1 == c2
+                        else f"{col_letters[c1]}{r}:{col_letters[c2]}{r}"
+                        for r, c1, c2 in runs
+                    )
+                    for address in join_addresses(addresses):
+                        wafermap_sheet.api.Range(address).Interior.Color = color_int
+                self._flush_status()
+
+                # --- Copy Row 1 (from memory) after last used row, ending with the "No." corner ---
+                row1_vals = [list(data_block[0]) + ["No."]]
+                mirror_row = wafermap_sheet.range((last_row+1,1),(last_row+1,last_col+1))
+                mirror_row.api.Value2 = row1_vals
+
+                # --- Copy Column A (from memory, shaped as a column) after last used column ---
+                colA_vals = [[block_row[0]] for block_row in data_block]
+                mirror_col = wafermap_sheet.range((1,last_col+1),(last_row,last_col+1))
+                mirror_col.api.Value2 = colA_vals
+
+                # --- Header formatting, once, after all writes ---
+                # Top + mirrored bottom row, then left + mirrored right column
+                # (the "No." corner is covered by both spans)
+                first_col, end_col, end_row = col_letters[1], col_letters[last_col+1], last_row + 1
+                style_range(
+                    wafermap_sheet.api.Range(f"{first_col}1:{end_col}1,{first_col}{end_row}:{end_col}{end_row}"),
+                    WAFERMAP_HEADER_FILL_INT, WAFERMAP_HEADER_FONT_INT, bold=True
+                )
+                style_range(
+                    wafermap_sheet.api.Range(f"{first_col}1:{first_col}{end_row},{end_col}1:{end_col}{end_row}"),
+                    WAFERMAP_HEADER_FILL_INT, WAFERMAP_HEADER_FONT_INT, bold=True
+                )
+
+                # --- Remove gridlines from wafermap sheet ---
+                wafermap_sheet.api.Parent.Windows(1).DisplayGridlines = False
+
+                # --- Alignment and borders on the final used range (incl. mirrored row/col) ---
+                ur = wafermap_sheet.range((1,1),(end_row,last_col+1)).api
+                ur.HorizontalAlignment = -4108  # xlCenter
+                ur.VerticalAlignment = -4108    # xlCenter
+                ur.Borders.Weight = 2
+
+                # --- Delete a leftover pivot helper sheet from older versions, in place ---
+                # (DisplayAlerts is already off, so Excel does not prompt)
+                if "Wafermap Pivot Table" in [sht.name for sht in wb_xlw.sheets]:
+                    wb_xlw.sheets["Wafermap Pivot Table"].api.Delete()
+            self._status_buffer.append((f"\n✅ Wafermap created on {sheet_name} sheet.", "#000000"))
+            self._flush_status()
 
         except Exception as e:
             # Ensure logger is configured
@@ -937,20 +1356,9 @@ class CSVWorkflowAutomationGUI:
             # Log the error
             logging.critical(f"Unexpected error: {e}", exc_info=True)
 
-            # Show status in GUI
-            self.show_status(f"❌ Unexpected error: {e}", color="#d32f2f")
-        finally:
-            if wb_xlw:
-                try:
-                    wb_xlw.save()   # ✅ persist changes (sheet deletion, edits, etc.)
-                    wb_xlw.close()
-                except:
-                    pass
-            if app:
-                try:
-                    app.quit()
-                except:
-                    pass
+            # Show status in GUI (after any warnings still buffered)
+            self._status_buffer.append((f"❌ Unexpected error: {e}", "#d32f2f"))
+            self._flush_status()
 
     def clear_all(self):
         """
@@ -958,19 +1366,16 @@ class CSVWorkflowAutomationGUI:
         - Clears file path and combobox values
         - Wipes status box
         - Resets stored attributes
+        Runs on the worker, after any action still in flight, so a
+        running conversion or wafermap cannot repopulate the state.
         """
+        self.run_in_background(self._clear_all_impl)
 
+    def _clear_all_impl(self):
+        """Release Excel and reset stored state, then reset the widgets on the Tk thread."""
         try:
-            # Reset file path and filter selections
-            self.path_var.set("")
-            if hasattr(self, "filter_var"):
-                self.filter_var.set("")
-            if hasattr(self, "filter_dropdown"):
-                self.filter_dropdown['values'] = []
-
-            # Clear status box
-            self.show_status("", clear=True)
-            self.show_status("✅ Cleared all selections.")
+            # Save, close and release the cached Excel session
+            self._shutdown_excel()
 
             # Reset any stored attributes
             if hasattr(self, "out_file"):
@@ -981,6 +1386,11 @@ class CSVWorkflowAutomationGUI:
                 self.base_name = None
             if hasattr(self, "raw_items"):
                 self.raw_items = []
+            self.csv_path = None
+            self._reset_sheet_caches()
+
+            # Reset file path, filter selections and status box
+            self._call_in_ui(self._reset_ui)
 
         except Exception as e:
             # Ensure logger is configured
@@ -992,10 +1402,44 @@ class CSVWorkflowAutomationGUI:
             # Show status in GUI
             self.show_status(f"❌ Unexpected error: {e}", color="#d32f2f")
             
+    def _reset_ui(self):
+        """Clear the file path, filter selection and status box (Tk thread)."""
+        self.path_var.set("")
+        if hasattr(self, "filter_var"):
+            self.filter_var.set("")
+        if hasattr(self, "filter_dropdown"):
+            self.filter_dropdown['values'] = []
+
+        # Clear status box
+        self.show_status("", clear=True)
+        self.show_status("✅ Cleared all selections.")
+
+    def exit_app(self):
+        """
+        Release the hidden Excel session and close the GUI.
+        Actions queued but not yet started are cancelled; only the running
+        action (if any) is waited on, so the workbook is still saved.
+        """
+        self.show_status("\n⏳ Closing... waiting for the current action to finish.")
+        self.root.update_idletasks()  # paint the status line before the Tk thread blocks
+
+        # Same effect as shutdown(cancel_futures=True), but applied before the
+        # Excel shutdown is queued so that task itself is not cancelled.
+        for future in list(self._pending):
+            future.cancel()
+        self.executor.submit(self._shutdown_excel)
+        self.executor.shutdown(wait=True)
+        self.root.destroy()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV Workflow Automation Tool v1.1.2")
+    parser.add_argument("--no-cache", "--no_cache", dest="no_cache", action="store_true",
+                        help="always rebuild the wafermap grid instead of reusing cached results")
+    # Ignore anything else on the command line (e.g. a CSV dropped onto the .exe)
+    args = parser.parse_known_args()[0]
+
     root = tk.Tk()
     root.title("CSV Workflow Automation Tool v1.1.2")
     root.iconbitmap(resource_path("sprout.ico"))  # subtle window icon only
-    app = CSVWorkflowAutomationGUI(root)
+    app = CSVWorkflowAutomationGUI(root, use_cache=not args.no_cache)
     root.mainloop()
-